@@ -3,32 +3,48 @@ import numpy as np
 import wave
 
 # Define format parameter constants
-BYTES = 256
+BYTES = 4096
 FORMAT = pyaudio.paInt16
 CHANNELS = 1
 RATE = 48000
 MAX_AMP = 2**15
 
 
-class Audio(pyaudio.PyAudio):
+def scale(data, num, den):
+    """
+    Return int16 samples in `data` scaled by `num`/`den` using int32
+    arithmetic, clipping the result to the int16 range.
+    """
+    tmp = data.astype(np.int32)
+    tmp *= num
+    tmp //= den
+    np.clip(tmp, -MAX_AMP, MAX_AMP - 1, out=tmp)
+    return tmp.astype(data.dtype)
+
+
+class Audio:
+
+    # PyAudio instance shared by all `Audio` objects (created on first use)
+    pyaudio_instance = None
 
     def __init__(self, channels=CHANNELS, rate=RATE, bytes=BYTES, format=FORMAT):
         """
-        Initialize interface with audio hardware.
+        Initialize audio data and format parameters.
         - `channels` (int): number of audio channels.
         - `rate` (int): rate of audio samples.
         - `bytes`(int): bytes of data to be read from the input stream.
         - `count`(int): count of chunks of data that have been read.
         - `format` (type): type of PyAudio samples
         - `data` (numpy.ndarray): array of audio samples.
+        - `chunks` (list): arrays read from the input stream.
+        - `peak` (int): largest absolute sample value in `data`, set by
+          `load` and reset to None by `finalize` and `rescale`; reset it
+          when assigning to `data` directly.
         - `nptype` (type): type of elements in `data`.
         - `input_stream` (pyAudio.Stream): input stream.
         - `output_stream`(pyAudio.Stream): output stream.
         """
 
-        # Initialize parent class
-        pyaudio.PyAudio.__init__(self)
-
         # Set format parameters
         self.channels = channels
         self.rate = rate
@@ -37,6 +53,8 @@ class Audio(pyaudio.PyAudio):
         # Initialize data attributes
         self.nptype = self.get_np_type(format)
         self.data = np.array([], dtype=self.nptype)
+        self.chunks = []
+        self.peak = None
         self.bytes = bytes
         self.count = 0
 
@@ -49,8 +67,17 @@ class Audio(pyaudio.PyAudio):
         Read a `bytes` size chunk of data from the input stream.
         """
         temp_str = self.input_stream.read(self.bytes)
-        array = np.fromstring(temp_str, dtype=self.nptype)
-        self.data = np.append(self.data, array)
+        array = np.frombuffer(temp_str, dtype=self.nptype)
+        self.chunks.append(array)
+
+    def finalize(self):
+        """
+        Concatenate the chunks read from the input stream into `data`.
+        """
+        if self.chunks:
+            self.data = np.concatenate([self.data] + self.chunks)
+            self.chunks = []
+            self.peak = None
 
     def put_bytes(self):
         """
@@ -59,24 +86,38 @@ class Audio(pyaudio.PyAudio):
 
         # Calculate where the current chunk starts and ends
         slice_from = self.count * self.bytes
-        slice_to = slice_from + self.bytes - 1
+        slice_to = slice_from + self.bytes
 
-        # Raise error if end of chunk is out of bounds
-        if slice_to > len(self.data):
-            raise IndexError(f"{slice_to} is out of bounds.")
-
-        # Write current chunk to output stream and update count
+        # Raise error if there is no data left to write
         array = self.data[slice_from : slice_to]
-        self.output_stream.write(array.tostring())
+        if array.size == 0:
+            raise IndexError(f"{slice_from} is out of bounds.")
+
+        # Write current chunk to output stream, through a read-only byte
+        # view if `data` is contiguous so no bytes object is allocated
+        if array.flags.c_contiguous:
+            self.output_stream.write(memoryview(array).cast("B").toreadonly())
+        else:
+            self.output_stream.write(array.tobytes())
         self.count += 1
 
+    @classmethod
+    def get_pyaudio(cls):
+        """
+        Return the shared PyAudio instance, initializing the interface
+        with the audio hardware only when a stream is first opened.
+        """
+        if cls.pyaudio_instance is None:
+            cls.pyaudio_instance = pyaudio.PyAudio()
+        return cls.pyaudio_instance
+
     def open_input_stream(self):
         """
         Make an input stream.
         """
 
-        # Call `open` function from parent class
-        self.input_stream = self.open(
+        # Call `open` function from shared PyAudio instance
+        self.input_stream = self.get_pyaudio().open(
             format=self.format,
             channels=self.channels,
             rate=self.rate,
@@ -89,6 +130,7 @@ class Audio(pyaudio.PyAudio):
         Close the input stream.
         """
         self.input_stream.close()
+        self.finalize()
         self.input_stream = None
 
     def open_output_stream(self):
@@ -96,11 +138,12 @@ class Audio(pyaudio.PyAudio):
         Make an output stream.
         """
 
-        # Call `open` function from parent class
-        self.output_stream = self.open(
+        # Call `open` function from shared PyAudio instance
+        self.output_stream = self.get_pyaudio().open(
             format=self.format,
             channels=self.channels,
             rate=self.rate,
+            frames_per_buffer=self.bytes,
             output=True
             )
 
@@ -122,13 +165,16 @@ class Audio(pyaudio.PyAudio):
         # Open output stream
         self.open_output_stream()
 
-        # Loop until all data has been written to output stream
+        # Write every chunk of data to output stream, slicing chunks from
+        # a single byte view of `data` (made contiguous once if strided)
         print("Playing...")
-        while True:
-            try:
-                self.put_bytes()
-            except IndexError:  # Not enough bytes left
-                break
+        data = np.ascontiguousarray(self.data)
+        view = memoryview(data).cast("B").toreadonly()
+        step = self.bytes * data.itemsize
+        write = self.output_stream.write
+        for start in range(0, len(view), step):
+            write(view[start : start + step])
+        self.count = (len(data) + self.bytes - 1) // self.bytes
         print("Stopped playing.")
 
         # Close output stream
@@ -140,14 +186,14 @@ class Audio(pyaudio.PyAudio):
         """
 
         # Convert data to a string
-        raw = self.data.tostring()
+        raw = self.data.tobytes()
 
         # Open output file
         wf = wave.open(path, 'wb')
 
         # Set header information
         wf.setnchannels(self.channels)
-        wf.setsampwidth(self.get_sample_size(self.format))
+        wf.setsampwidth(pyaudio.get_sample_size(self.format))
         wf.setframerate(self.rate)
 
         # Write data to file
@@ -165,26 +211,17 @@ class Audio(pyaudio.PyAudio):
         wf = wave.open(path, "rb")
 
         # Get header information
-        self.format = self.get_format_from_width(wf.getsampwidth())
+        self.format = pyaudio.get_format_from_width(wf.getsampwidth())
         self.nptype = self.get_np_type(self.format)
         self.channels = wf.getnchannels()
         self.rate = wf.getframerate()
 
-        # Initialize data array
-        self.data = np.array([], dtype=self.nptype)
-
-        # Read `bytes` size chunk of data from file
-        raw = wf.readframes(self.bytes)
+        # Read all frames at once and convert raw string to data
+        raw = wf.readframes(wf.getnframes())
+        self.data = np.frombuffer(raw, dtype=self.nptype).copy()
 
-        # Loop until data runs out
-        while raw:
-
-            # Convert raw string to data and append to `data`
-            array = np.fromstring(raw, dtype=self.nptype)
-            self.data = np.append(self.data, array)
-
-            # Read next chunk of data
-            raw = wf.readframes(self.bytes)
+        # Store peak, promoting to int32 so abs(-32768) does not overflow
+        self.peak = int(np.abs(self.data, dtype=np.int32).max(initial=0))
 
         # Close the file
         wf.close()
@@ -205,19 +242,25 @@ class Audio(pyaudio.PyAudio):
         if not 0 <= val <= 1:
             raise ValueError("Scaling factor should be between 0 and 1.")
 
-        # Find sample with largest absolute value (peak)
-        peak = 0
-        for i in range(len(self.data) - 1):
-            peak = max(peak, abs(self.data[i]))
-
-        # Normalize scaling factor to prevent peak values over `MAX_AMP`
-        rescale_factor = val * MAX_AMP / peak
-
-        # Scale all sample values by normalized factor
-        self.data = (self.data * rescale_factor).astype(self.nptype)
+        # Find sample with largest absolute value (peak), promoting to
+        # int32 so that abs(-32768) does not overflow
+        peak = int(np.abs(self.data, dtype=np.int32).max(initial=0))
+        if peak == 0:
+            return
+
+        # Scale all sample values by `val * MAX_AMP / peak` in integer
+        # arithmetic, preventing peak values over `MAX_AMP`, and write
+        # them back in place unless the data is read-only
+        scaled = scale(self.data, int(val * MAX_AMP), peak)
+        if self.data.flags.writeable:
+            self.data[...] = scaled
+        else:
+            self.data = scaled
+        self.peak = None
 
     def __len__(self):
         """
-        Return the number of elements in the data array.
+        Return the number of elements in the data array, including
+        chunks read from the input stream but not yet finalized.
         """
-        return self.data.shape[0]
+        return self.data.shape[0] + sum(chunk.shape[0] for chunk in self.chunks)
@@ -5,50 +5,154 @@ import simpleaudio
 import nltk
 import string
 import numpy
+import functools
+import itertools
+import re
+import threading
 
 # Sample rate constant
 RATE = 16000
 
+# Shared punctuation table (keeping apostrophes for contractions) and
+# pronunciation lexicon (loaded on first use)
+_PUNCT = string.punctuation.replace("'", "")
+_PUNCT_TABLE = str.maketrans(_PUNCT, " " * len(_PUNCT))
+_LEXICON = None
+_LEXICON_THREAD = None
+
+# Patterns for words (including contractions such as "don't", which are
+# CMUdict entries) and for characters that are not allowed in the text
+_WORD_RE = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)*")
+_INVALID_RE = re.compile(r"[^A-Za-z'\s]")
+
+
+def _load_lexicon():
+    """
+    Load the CMUdict pronunciation lexicon.
+    """
+    global _LEXICON
+    _LEXICON = nltk.corpus.cmudict.dict()
+
+
+def _load_lexicon_quietly():
+    """
+    Load the pronunciation lexicon, ignoring errors so that the retry
+    in `_get_lexicon` reports them once.
+    """
+    try:
+        _load_lexicon()
+    except Exception:
+        pass
+
+
+def _preload_lexicon():
+    """
+    Start loading the pronunciation lexicon in a background thread.
+    """
+    global _LEXICON_THREAD
+    if _LEXICON is None and _LEXICON_THREAD is None:
+        _LEXICON_THREAD = threading.Thread(target=_load_lexicon_quietly, daemon=True)
+        _LEXICON_THREAD.start()
+
+
+def _get_lexicon():
+    """
+    Return the CMUdict pronunciation lexicon, loading it only once.
+    """
+
+    # Wait for background loading, if started
+    if _LEXICON_THREAD is not None:
+        _LEXICON_THREAD.join()
+
+    # Load lexicon if not loaded yet (or background loading failed)
+    if _LEXICON is None:
+        _load_lexicon()
+    return _LEXICON
+
+
+@functools.lru_cache(maxsize=None)
+def _get_filename(ph1, ph2):
+    """
+    Return the filename for the diphone made of phones `ph1` and `ph2`.
+    """
+    ph1 = ph1 if ph1 is not None else "pau"
+    ph2 = ph2 if ph2 is not None else "pau"
+    return f"{ph1}-{ph2}.wav"
+
+
+@functools.lru_cache(maxsize=2048)
+def _load_diphone(directory, filename):
+    """
+    Load a diphone file into an `Audio` object, caching the result so
+    that repeated diphones are only read from disk once. The cached
+    object is never handed out; use `_get_diphone` instead.
+    """
+    audio = simpleaudio.Audio()
+    audio.load(os.path.join(directory, filename))
+
+    # Make the cached samples read-only, since they are shared
+    audio.data.flags.writeable = False
+    return audio
+
+
+def _get_diphone(directory, filename):
+    """
+    Return a new `Audio` object for a diphone file, sharing the cached
+    samples (a read-only array) and peak of the loaded file.
+    """
+    cached = _load_diphone(directory, filename)
+    audio = simpleaudio.Audio(channels=cached.channels, rate=cached.rate, format=cached.format)
+    audio.data = cached.data
+    audio.peak = cached.peak
+    return audio
+
+
+def _positive_int(value):
+    """
+    Parse a command-line argument as a positive integer.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not an integer")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{number} is not a positive integer")
+    return number
+
 
 class Utterance:
 
     def __init__(self, utterance):
         """
         Initialize utterance.
-        - `filter` (set): punctuation to be removed from the utterance.
         - `lexicon` (dict): pronunciation lexicon (CMUdict).
         - `utterance` (str): input text.
         - `phones` (list): utterance phonemes.
         """
 
-        # Initialize token filter and pronunciation lexicon
-        self.filter = set(string.punctuation)
-        self.lexicon = nltk.corpus.cmudict.dict()
+        # Initialize pronunciation lexicon
+        self.lexicon = _get_lexicon()
         self.utterance = utterance
 
         # Tokenize and extract phones from input utterance
-        self.phones = []
-        for word in self.get_words(utterance):
-            for phone in self.get_phones(word):
-                self.phones.append(phone)
+        self.phones = list(itertools.chain.from_iterable(
+            self.get_phones(word) for word in self.get_words(utterance)
+            ))
 
     def get_words(self, utterance):
         """
         Return tokenized utterance without punctuation.
         """
-        words = []
-        for word in nltk.word_tokenize(utterance):
 
-            # Exclude words in filter
-            if word in self.filter:
-                continue
+        # Replace punctuation other than apostrophes with spaces so it
+        # still separates words
+        utterance = utterance.translate(_PUNCT_TABLE)
 
-            # Exit if word contains non-alphabetic characters
-            if not word.isalpha():
-                sys.exit("Text must only contain alphabetic characters")
-            words.append(word.lower())
+        # Exit if text contains non-alphabetic characters
+        if _INVALID_RE.search(utterance):
+            sys.exit("Text must only contain alphabetic characters")
 
-        return words
+        return _WORD_RE.findall(utterance.lower())
 
     def get_phones(self, word, variant=0):
         """
@@ -66,25 +170,19 @@ class Utterance:
         else:
             pronunciation = lex_entry[0]
 
-        return map(lambda phone: phone.lower().rstrip("012"), pronunciation)
+        return [phone.lower().rstrip("012") for phone in pronunciation]
 
     def get_diphones(self):
         """
         Expand phone sequence into a diphone sequence.
         """
 
-        # Initialize diphone sequence
-        diphones = [[None, self.phones[0]]]
-
-        # Expand phones into diphones
-        for i in range(len(self.phones) - 1):
-            ph1 = self.phones[i]
-            ph2 = self.phones[i + 1]
-            diphones.append([ph1, ph2])
+        # Exit if there are no phones to expand
+        if not self.phones:
+            sys.exit("Text must contain at least one word")
 
-        # Add last diphone to sequence
-        diphones.append([self.phones[len(self.phones) - 1], None])
-        return diphones
+        # Pair each phone with the next one, padding both ends with silence
+        return list(zip([None, *self.phones], [*self.phones, None]))
 
 
 class Synth:
@@ -92,56 +190,114 @@ class Synth:
     def __init__(self, diphones, directory):
         """
         Initialize synthesizer.
-        - `diphones` (list): sequence of diphones
+        - `diphones` (list): sequence of diphone tuples
+        - `filenames` (list): sequence of diphone filenames
         - `audio` (dict): dictionary of filename-audio pairs
+        - `pool` (numpy.ndarray): samples of every unique diphone end-to-end
+        - `offsets` (numpy.ndarray): start of each unique diphone in `pool`
+        - `lengths` (numpy.ndarray): number of samples of each unique diphone
+        - `seq_ids` (numpy.ndarray): sequence of diphone ids into `pool`
         """
         self.diphones = diphones
+        self.filenames = [self.get_filename(diphone) for diphone in diphones]
 
         # Create mapping from diphone filenames to audio
         self.audio = {}
-        for diphone in self.diphones:
-            filename = self.get_filename(diphone)
+        for filename in self.filenames:
             if filename not in self.audio:
 
-                # Ensure that file exists
-                path = os.path.join(directory, filename)
-                if not os.path.isfile(path):
+                # Load its contents (exit if file doesn't exist)
+                try:
+                    self.audio[filename] = _get_diphone(directory, filename)
+                except FileNotFoundError:
                     sys.exit(f"Couldn't locate '{filename}'")
 
-                # Load its contents and add to dictionary
-                audio = simpleaudio.Audio()
-                audio.load(path)
-                self.audio[filename] = audio
+        # Pack the audio of each unique diphone into a contiguous pool
+        # and index the diphone sequence by position in the pool
+        ids = {filename: i for i, filename in enumerate(self.audio)}
+        self.lengths = numpy.array([audio.data.size for audio in self.audio.values()], dtype=numpy.int64)
+        self.offsets = numpy.cumsum(self.lengths) - self.lengths
+        self.pool = numpy.concatenate([audio.data for audio in self.audio.values()])
+        self.seq_ids = numpy.array([ids[filename] for filename in self.filenames], dtype=numpy.int64)
 
     def get_filename(self, diphone):
         """
         Given a diphone, return its corresponding filename.
         """
-        ph1 = diphone[0] if diphone[0] is not None else "pau"
-        ph2 = diphone[1] if diphone[1] is not None else "pau"
-        return f"{ph1}-{ph2}.wav"
+        return _get_filename(diphone[0], diphone[1])
+
+    def get_scale(self, val=1.0):
+        """
+        Return the numerator and denominator of the factor that rescales
+        the diphone sequence so that its peak reaches `val` times the
+        maximum amplitude.
+        """
+
+        # Find the peak across the diphones used in the sequence from the
+        # peaks cached when each diphone was loaded
+        peak = max((audio.peak for audio in self.audio.values()), default=0)
+
+        # Leave silent audio unchanged
+        if peak == 0:
+            return 1, 1
+        return int(val * simpleaudio.MAX_AMP), peak
+
+    def get_chunks(self):
+        """
+        Yield the rescaled audio of each diphone in the sequence as a
+        slice of the rescaled pool.
+        """
+
+        # Rescale the pool once, so each diphone is only sliced below
+        num, den = self.get_scale()
+        pool = simpleaudio.scale(self.pool, num, den)
+
+        # Slice the audio of each diphone from the pool
+        offsets = self.offsets.tolist()
+        lengths = self.lengths.tolist()
+        for i in self.seq_ids.tolist():
+            offset = offsets[i]
+            yield pool[offset : offset + lengths[i]]
 
-    def get_audio(self, rate=RATE):
+    def get_audio(self, rate=RATE, bytes=simpleaudio.BYTES):
         """
         Return synthesized output as an `Audio` object containing
         the concatenated audio for the input diphone sequence.
         """
 
-        # Create audio sequence from diphones
-        output_audio = []
-        for diphone in self.diphones:
-            filename = self.get_filename(diphone)
-            audio = self.audio[filename]
-            output_audio.append(audio.data)
-
         # Instantiate output `Audio` object
-        output = simpleaudio.Audio(rate=rate)
+        output = simpleaudio.Audio(rate=rate, bytes=bytes)
+
+        # Preallocate output array for the whole diphone sequence
+        total = int(self.lengths[self.seq_ids].sum())
+        output.data = numpy.empty(total, dtype=output.nptype)
 
-        # Concatenate audio and rescale
-        output.data = numpy.concatenate(output_audio)
-        output.rescale(1.0)
+        # Copy the audio of each diphone into the output array
+        position = 0
+        for chunk in self.get_chunks():
+            output.data[position : position + chunk.size] = chunk
+            position += chunk.size
         return output
 
+    def play(self, rate=RATE, bytes=simpleaudio.BYTES):
+        """
+        Play the synthesized output, streaming each rescaled diphone to
+        the output stream without building the concatenated audio.
+        """
+
+        # Instantiate output `Audio` object and open output stream
+        output = simpleaudio.Audio(rate=rate, bytes=bytes)
+        output.open_output_stream()
+
+        # Write each diphone to output stream through a read-only byte view
+        print("Playing...")
+        for chunk in self.get_chunks():
+            output.output_stream.write(memoryview(chunk).cast("B").toreadonly())
+        print("Stopped playing.")
+
+        # Close output stream
+        output.close_output_stream()
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -150,19 +306,28 @@ if __name__ == "__main__":
     parser.add_argument("--diphones", default="./diphones", help="Directory containing the diphone files.")
     parser.add_argument("--play", action="store_true", default=True, help="Play the output audio.")
     parser.add_argument("--save", default=None, help="Save the output audio.")
+    parser.add_argument("--buffer-size", type=_positive_int, default=simpleaudio.BYTES, help="Frames per buffer for audio playback.")
     parser.add_argument("--text", required=True, help="Text to be synthesised.")
     args = parser.parse_args()
 
+    # Load pronunciation lexicon in the background while the audio
+    # hardware is initialized for playback
+    _preload_lexicon()
+    if args.play:
+        simpleaudio.Audio.get_pyaudio()
+
     # Extract diphones from input text
     utterance = Utterance(args.text)
     diphones = utterance.get_diphones()
 
     # Synthesize diphone sequence
     synth = Synth(diphones, args.diphones)
-    output = synth.get_audio()
 
-    # Play and save output synthesis
-    if args.play:
-        output.play()
+    # Play and save output synthesis (stream playback if not saving)
     if args.save:
+        output = synth.get_audio(bytes=args.buffer_size)
+        if args.play:
+            output.play()
         output.save(args.save)
+    elif args.play:
+        synth.play(bytes=args.buffer_size)